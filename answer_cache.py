@@ -0,0 +1,45 @@
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import re
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different phrasings share a cache entry"""
+    return " ".join(re.sub(r"[^\w$%'-]+", " ", question.lower()).split())
+
+def knowledge_base_hash(knowledge_base_path: str) -> str:
+    """Hash of the knowledge base, used to detect stale precomputed answers"""
+    with open(knowledge_base_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class AnswerCache:
+    """
+    Precomputed answers to the most frequent questions, built by warmup_answers.py.
+
+    The artifact records the hash of the knowledge base it was built from, and
+    is ignored if the knowledge base has changed since.
+    """
+
+    def __init__(self, path: str, knowledge_base_path: str):
+        self.path = path
+        self.knowledge_base_path = knowledge_base_path
+        self.answers: Dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        """Load the artifact if it matches the current knowledge base"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+
+        if not os.path.exists(self.knowledge_base_path) or \
+                artifact.get('knowledge_base_sha256') != knowledge_base_hash(self.knowledge_base_path):
+            print(f"Ignoring stale answer cache {self.path}, run warmup_answers.py to rebuild it")
+            return
+        self.answers = artifact.get('answers', {})
+
+    def get(self, question: str) -> Optional[str]:
+        """Get the precomputed answer for a question, if there is one"""
+        return self.answers.get(normalize_question(question))
@@ -1,8 +1,17 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, make_response
 from flask_cors import CORS
-from rag_agent import ChromapagesRAGAgent
+from flask_compress import Compress
+from tenant_manager import TenantIndexManager
+from conversation import ConversationMemory, is_follow_up
 from appointment_agent import AppointmentAgent
 from ticket_manager import TicketManager, TicketStatus, TicketPriority
+from config import DEFAULT_TENANT, PREWARM_TENANTS, MAX_CONVERSATIONS, MAX_SESSION_ID_LENGTH, CHAT_LOG_PATH
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime
+import hashlib
+import json
+import threading
 import os
 import re
 
@@ -13,21 +22,88 @@ CORS(app, resources={
     r"/*": {
         "origins": "*",
         "methods": ["POST", "OPTIONS", "GET"],
-        "allow_headers": ["Content-Type"]
+        "allow_headers": ["Content-Type", "X-Tenant-ID", "If-None-Match"],
+        "expose_headers": ["ETag"]
     }
 })
 
+# Compress responses with brotli or gzip, whichever the client accepts
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+# Static files are streamed, which Flask-Compress only supports with brotli
+app.config['COMPRESS_ALGORITHM_STREAMING'] = ['br']
+app.config['COMPRESS_MIMETYPES'] = [
+    'text/html', 'text/css', 'application/javascript', 'text/javascript', 'application/json'
+]
+Compress(app)
+
+# Fingerprinted static URLs never change content, so browsers can cache them for a year
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+static_fingerprints = {}
+
 # Initialize agents lazily
-rag_agent = None
+tenant_manager = None
 appointment_agent = None
 ticket_manager = None
 conversation_history = []
 
-def get_rag_agent():
-    global rag_agent
-    if rag_agent is None:
-        rag_agent = ChromapagesRAGAgent()
-    return rag_agent
+# Bounded memory per chat session, least recently active sessions are dropped first
+conversations = OrderedDict()
+conversations_lock = threading.Lock()
+chat_log_lock = threading.Lock()
+
+def get_tenant_manager():
+    global tenant_manager
+    if tenant_manager is None:
+        tenant_manager = TenantIndexManager()
+    return tenant_manager
+
+def get_rag_agent(tenant_id: str = DEFAULT_TENANT):
+    """Use a tenant's RAG agent in a with block, so its index stays open while answering"""
+    return get_tenant_manager().agent(tenant_id)
+
+def get_tenant_id(data: dict = None) -> str:
+    """Get the tenant for the current request from the X-Tenant-ID header or request body"""
+    tenant_id = request.headers.get('X-Tenant-ID') or (data or {}).get('tenant')
+    return tenant_id or DEFAULT_TENANT
+
+def get_conversation(tenant_id: str, session_id: str) -> ConversationMemory:
+    """Get the conversation memory for a chat session"""
+    key = (tenant_id, session_id)
+    with conversations_lock:
+        if key in conversations:
+            conversations.move_to_end(key)
+        else:
+            conversations[key] = ConversationMemory()
+            if len(conversations) > MAX_CONVERSATIONS:
+                conversations.popitem(last=False)
+        return conversations[key]
+
+def log_chat_message(tenant_id: str, message: str):
+    """Append a chat message to the chat log that warmup_answers.py mines for frequent questions"""
+    if not CHAT_LOG_PATH:
+        return
+    entry = {'timestamp': datetime.now().isoformat(), 'tenant': tenant_id, 'message': message}
+    try:
+        with chat_log_lock:
+            with open(CHAT_LOG_PATH, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        app.logger.error(f"Error writing chat log: {str(e)}")
+
+def load_answer_caches():
+    """Load precomputed answers at startup so popular questions are fast right after a cold start"""
+    for tenant_id in [DEFAULT_TENANT] + PREWARM_TENANTS:
+        if get_tenant_manager().has_tenant(tenant_id):
+            get_tenant_manager().get_answer_cache(tenant_id)
+
+def prewarm_tenants():
+    """Load the hot tenants' indexes in the background so startup is not blocked"""
+    if PREWARM_TENANTS:
+        threading.Thread(
+            target=get_tenant_manager().prewarm,
+            args=(PREWARM_TENANTS,),
+            daemon=True
+        ).start()
 
 def get_appointment_agent():
     global appointment_agent
@@ -41,6 +117,53 @@ def get_ticket_manager():
         ticket_manager = TicketManager()
     return ticket_manager
 
+def static_fingerprint(filename: str) -> str:
+    """Short content hash of a static file, computed once per process"""
+    if filename not in static_fingerprints:
+        try:
+            with open(os.path.join(app.static_folder, filename), 'rb') as f:
+                static_fingerprints[filename] = hashlib.md5(f.read()).hexdigest()[:12]
+        except OSError:
+            static_fingerprints[filename] = None
+    return static_fingerprints[filename]
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """Add the content hash to url_for('static', ...) URLs so they can be cached forever"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        fingerprint = static_fingerprint(values['filename'])
+        if fingerprint:
+            values['v'] = fingerprint
+
+@app.after_request
+def set_cache_headers(response):
+    """Cache fingerprinted static assets forever and revalidate everything else"""
+    if request.endpoint == 'static' and response.status_code == 200:
+        if request.args.get('v') == static_fingerprint(request.view_args.get('filename', '')):
+            response.headers['Cache-Control'] = f'public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def conditional_json(etag: str, build_payload):
+    """
+    Return a JSON response tagged with a weak ETag, or 304 Not Modified if the
+    client already has it. The payload is only built when it has changed.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(build_payload())
+    # Weak, so the ETag stays the same whichever compression is applied
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def tickets_etag(tickets) -> str:
+    """ETag for a list of tickets, derived from their ids and last update times"""
+    versions = sorted(f"{ticket['id']}@{ticket['updated_at']}" for ticket in tickets)
+    return hashlib.md5("|".join(versions).encode('utf-8')).hexdigest()
+
 def get_direct_response(message: str) -> str:
     """Get direct response based on message content"""
     message_lower = message.lower()
@@ -71,7 +194,10 @@ def health_check():
 
 @app.route('/')
 def home():
-    return render_template('index.html')
+    response = make_response(render_template('index.html'))
+    response.add_etag(weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/chat', methods=['POST', 'OPTIONS'])
 def chat():
@@ -84,16 +210,40 @@ def chat():
         
         if not message:
             return jsonify({'error': 'No message provided'}), 400
+
+        tenant_id = get_tenant_id(data)
+        if not isinstance(tenant_id, str):
+            return jsonify({'error': 'Invalid tenant'}), 400
+        if not get_tenant_manager().has_tenant(tenant_id):
+            return jsonify({'error': 'Unknown tenant'}), 404
         
-        # Try to get a direct response first
-        direct_response = get_direct_response(message)
-        
-        if direct_response:
-            response = direct_response
-        else:
-            # Fallback to RAG agent for more complex queries
-            current_agent = get_rag_agent()
-            response = current_agent.chat(message)
+        # Sessions get conversation-aware answers, so follow-up questions are understood
+        session_id = data.get('session_id')
+        if session_id is not None and (not isinstance(session_id, str) or len(session_id) > MAX_SESSION_ID_LENGTH):
+            return jsonify({'error': 'Invalid session_id'}), 400
+        memory = get_conversation(tenant_id, session_id) if session_id else None
+        log_chat_message(tenant_id, message)
+
+        # Messages of the same session are handled one at a time so their turns stay in order
+        with memory.lock if memory is not None else nullcontext():
+            # Popular standalone questions are answered from the precomputed answer cache
+            cached_response = None
+            if memory is None or not memory.turns or not is_follow_up(message):
+                cached_response = get_tenant_manager().get_answer_cache(tenant_id).get(message)
+
+            # Then try a direct response (canned answers only apply to Chromapages itself)
+            direct_response = None
+            if not cached_response and tenant_id == DEFAULT_TENANT:
+                direct_response = get_direct_response(message)
+
+            if cached_response or direct_response:
+                response = cached_response or direct_response
+                if memory is not None:
+                    memory.add_turn(message, response)
+            else:
+                # Fallback to the tenant's RAG agent for more complex queries
+                with get_rag_agent(tenant_id) as current_agent:
+                    response = current_agent.chat(message, memory)
         
         # Store conversation history
         conversation_history.append({
@@ -145,7 +295,7 @@ def get_ticket(ticket_id):
         ticket_manager = get_ticket_manager()
         ticket = ticket_manager.get_ticket(ticket_id)
         if ticket:
-            return jsonify(ticket)
+            return conditional_json(tickets_etag([ticket]), lambda: ticket)
         return jsonify({'error': 'Ticket not found'}), 404
     except Exception as e:
         app.logger.error(f"Error getting ticket: {str(e)}")
@@ -194,7 +344,7 @@ def get_customer_tickets(email):
     try:
         ticket_manager = get_ticket_manager()
         tickets = ticket_manager.get_tickets_by_customer(email)
-        return jsonify({'tickets': tickets})
+        return conditional_json(tickets_etag(tickets), lambda: {'tickets': tickets})
     except Exception as e:
         app.logger.error(f"Error getting customer tickets: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -208,8 +358,8 @@ def get_available_slots():
             return jsonify({'error': 'Date parameter is required'}), 400
             
         appointment_agent = get_appointment_agent()
-        slots = appointment_agent.get_available_slots(date)
-        return jsonify({'slots': slots})
+        etag = f"slots-{date}-{appointment_agent.calendar_version}"
+        return conditional_json(etag, lambda: {'slots': appointment_agent.get_available_slots(date)})
     except Exception as e:
         app.logger.error(f"Error getting available slots: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -243,6 +393,9 @@ def book_appointment():
         app.logger.error(f"Error booking appointment: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+load_answer_caches()
+prewarm_tenants()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port) 
\ No newline at end of file
@@ -14,6 +14,7 @@ class AppointmentAgent:
         self.email_address = os.getenv("EMAIL_ADDRESS")
         self.email_password = os.getenv("EMAIL_PASSWORD")
         self.available_slots = self._load_available_slots()
+        self.calendar_version = self._calendar_file_version()
 
     def _load_available_slots(self) -> Dict[str, List[str]]:
         """Load or initialize available appointment slots"""
@@ -36,6 +37,12 @@ class AppointmentAgent:
         """Save current appointment slots to file"""
         with open('appointments.json', 'w') as f:
             json.dump(self.available_slots, f)
+        self.calendar_version = self._calendar_file_version()
+
+    def _calendar_file_version(self) -> str:
+        """Version of the slot calendar, changes whenever appointments.json is written"""
+        stat = os.stat('appointments.json')
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
 
     def get_available_slots(self, date: str) -> List[str]:
         """Get available slots for a specific date"""
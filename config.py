@@ -14,5 +14,28 @@ TOP_P = 0.95
 TOP_K = 40
 MAX_OUTPUT_TOKENS = 2048
 
+# Retrieval configuration
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+RETRIEVAL_K = 3
+
+# Conversation configuration
+CONVERSATION_MAX_TURNS = 4
+CONVERSATION_TOKEN_BUDGET = 1500
+CONVERSATION_SUMMARY_TOKENS = 300
+MAX_CONVERSATIONS = int(os.getenv("MAX_CONVERSATIONS", "1000"))
+MAX_SESSION_ID_LENGTH = 128
+
+# Answer warm-up configuration
+CHAT_LOG_PATH = os.getenv("CHAT_LOG_PATH")
+WARMUP_QUESTIONS_PATH = "warmup_questions.txt"
+WARMUP_TOP_N = 50
+
 # Agent configuration
-VERBOSE = True 
\ No newline at end of file
+VERBOSE = True
+
+# Multi-tenant configuration
+DEFAULT_TENANT = "default"
+TENANTS_DIR = os.getenv("TENANTS_DIR", "tenants")
+TENANT_INDEX_MEMORY_MB = int(os.getenv("TENANT_INDEX_MEMORY_MB", "512"))
+PREWARM_TENANTS = [t.strip() for t in os.getenv("PREWARM_TENANTS", "").split(",") if t.strip()]
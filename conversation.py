@@ -0,0 +1,156 @@
+from collections import deque
+from typing import List, Optional
+import math
+import re
+import threading
+from config import CONVERSATION_MAX_TURNS, CONVERSATION_TOKEN_BUDGET, CONVERSATION_SUMMARY_TOKENS
+
+# Pronouns that make a question lean on an earlier turn, e.g. "how long would that take?"
+FOLLOW_UP_PATTERN = re.compile(r"\b(it|its|that|those|they|them)\b", re.IGNORECASE)
+
+# Words that carry no topic when lifting context from an earlier question
+NON_TOPIC_WORDS = {
+    "a", "about", "also", "an", "and", "any", "are", "can", "could", "did", "do", "does", "else",
+    "for", "how", "i", "in", "is", "it", "me", "much", "my", "of", "on", "or", "please", "should",
+    "tell", "the", "their", "there", "these", "this", "to", "too", "was", "we", "what", "when",
+    "where", "which", "who", "why", "will", "with", "would", "you", "your",
+}
+
+# Short follow-ups with hardly a topic of their own are resolved without the LLM
+MAX_DETERMINISTIC_QUESTION_WORDS = 8
+MAX_DETERMINISTIC_OWN_TOPIC_WORDS = 2
+MAX_DETERMINISTIC_TOPIC_WORDS = 6
+
+REWRITE_TEMPLATE = """Rewrite the follow-up question as a standalone question about {business_name} that can be
+understood without the conversation. Return only the rewritten question.
+
+Conversation:
+{history}
+
+Follow-up question: {question}
+
+Standalone question:"""
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate from the word count"""
+    return math.ceil(len(text.split()) * 4 / 3)
+
+def _first_sentence(text: str, max_words: int = 30) -> str:
+    sentence = re.split(r"(?<=[.!?])\s+", text.strip(), maxsplit=1)[0]
+    words = sentence.split()
+    return " ".join(words[:max_words]) + ("..." if len(words) > max_words else "")
+
+class ConversationMemory:
+    """
+    Conversation history kept at a bounded size.
+
+    The last ``max_turns`` turns are kept verbatim. Older turns are folded into a
+    rolling summary, and the oldest summary lines are dropped once it exceeds
+    ``summary_tokens``, so the history never exceeds ``token_budget`` however long
+    the conversation runs. The latest turn is never summarized away; if it alone
+    exceeds the budget, its answer is truncated to fit.
+
+    ``lock`` serializes requests of the same session, so concurrent messages do
+    not interleave their turns.
+    """
+
+    def __init__(self, max_turns: int = CONVERSATION_MAX_TURNS,
+                 token_budget: int = CONVERSATION_TOKEN_BUDGET,
+                 summary_tokens: int = CONVERSATION_SUMMARY_TOKENS):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.turns: deque = deque()
+        self.summary: deque = deque()
+        self.lock = threading.Lock()
+
+    def add_turn(self, user: str, assistant: str, standalone_question: Optional[str] = None):
+        """Record a turn and compact older history to stay within budget"""
+        self.turns.append({
+            'user': user,
+            'assistant': assistant,
+            'standalone_question': standalone_question or user
+        })
+        self._compact()
+
+    def _compact(self):
+        # Only older turns are folded into the summary, the latest one always stays verbatim
+        while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self.token_count() > self.token_budget):
+            turn = self.turns.popleft()
+            self.summary.append(
+                f"User asked: {turn['standalone_question']} Assistant: {_first_sentence(turn['assistant'])}"
+            )
+            while self.summary and self._summary_token_count() > self.summary_tokens:
+                self.summary.popleft()
+
+        # A latest turn that alone exceeds the budget keeps as much of the answer as fits
+        if self.turns and self.token_count() > self.token_budget:
+            latest = self.turns[-1]
+            available = self.token_budget - self._summary_token_count() - estimate_tokens(latest['user'])
+            max_words = max(available, 0) * 3 // 4
+            words = latest['assistant'].split()
+            latest['assistant'] = " ".join(words[:max_words]) + "..." if max_words else "..."
+
+    def _summary_token_count(self) -> int:
+        return sum(estimate_tokens(line) for line in self.summary)
+
+    def token_count(self) -> int:
+        """Estimated tokens of the summary and recent turns"""
+        return self._summary_token_count() + sum(
+            estimate_tokens(turn['user']) + estimate_tokens(turn['assistant']) for turn in self.turns
+        )
+
+    def last_standalone_question(self) -> Optional[str]:
+        return self.turns[-1]['standalone_question'] if self.turns else None
+
+    def format_history(self) -> str:
+        """Format the summary and recent turns for a prompt"""
+        lines = []
+        if self.summary:
+            lines.append("Summary of earlier conversation: " + " ".join(self.summary))
+        for turn in self.turns:
+            lines.append(f"User: {turn['user']}")
+            lines.append(f"Assistant: {turn['assistant']}")
+        return "\n".join(lines)
+
+def is_follow_up(question: str) -> bool:
+    """Check whether a question refers back to an earlier turn"""
+    return bool(FOLLOW_UP_PATTERN.search(question))
+
+def topic_words(question: str) -> List[str]:
+    """Topic words of a question, e.g. ['e-commerce', 'website'] for 'How much is an e-commerce website?'"""
+    words = re.findall(r"[\w$%'-]+", question.lower())
+    return [word for word in words if word not in NON_TOPIC_WORDS and not FOLLOW_UP_PATTERN.fullmatch(word)]
+
+def rewrite_question(question: str, memory: ConversationMemory, llm=None,
+                     business_name: str = "Chromapages") -> str:
+    """
+    Rewrite a follow-up question into a standalone query for retrieval.
+
+    Questions that do not refer back to the conversation are returned as they are.
+    Short follow-ups with no more than a couple of topic words of their own, like
+    "how long would that take?", get the previous question's topic appended, which
+    needs no model call. Other follow-ups are rewritten by the LLM.
+    """
+    previous = memory.last_standalone_question()
+    if previous is None or not is_follow_up(question):
+        return question
+
+    question_words = topic_words(question)
+    topic = [word for word in topic_words(previous) if word not in question_words]
+    if len(question.split()) <= MAX_DETERMINISTIC_QUESTION_WORDS \
+            and len(question_words) <= MAX_DETERMINISTIC_OWN_TOPIC_WORDS \
+            and 0 < len(topic) <= MAX_DETERMINISTIC_TOPIC_WORDS:
+        return f"{question} ({' '.join(topic)})"
+
+    if llm is None:
+        return f"{question} ({previous})"
+    try:
+        response = llm.invoke(REWRITE_TEMPLATE.format(
+            business_name=business_name, history=memory.format_history(), question=question
+        ))
+        rewritten = getattr(response, "content", response).strip()
+        return rewritten or question
+    except Exception as e:
+        print(f"Error rewriting question: {str(e)}")
+        return f"{question} ({previous})"
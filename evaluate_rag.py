@@ -0,0 +1,394 @@
+"""
+Offline evaluation of the RAG agent: answer quality vs. latency and cost.
+
+Runs a labelled question set (eval/questions.jsonl) through ChromapagesRAGAgent
+for every configuration in a parameter sweep and reports retrieval recall@k,
+answer grounding, tokens per answer and latency percentiles.
+
+Modes:
+    live    call Gemini for embeddings and answers
+    record  like live, and save every response to the recordings file
+    replay  answer from the recordings file only, no API key or network needed
+    stub    deterministic local stand-ins for embeddings and answers, for smoke runs
+
+Usage:
+    python evaluate_rag.py --mode record
+    python evaluate_rag.py --mode replay --chunk-size 500,1000 --k 3,5 --max-output-tokens 512,2048
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from config import CHUNK_SIZE, CHUNK_OVERLAP, RETRIEVAL_K, TEMPERATURE, MAX_OUTPUT_TOKENS
+from rag_agent import ChromapagesRAGAgent
+
+STUB_EMBEDDING_SIZE = 256
+STOPWORDS = {
+    "about", "also", "and", "are", "based", "been", "can", "does", "for", "from", "have",
+    "here", "into", "more", "that", "the", "their", "them", "then", "there", "these",
+    "they", "this", "what", "when", "which", "will", "with", "would", "your",
+}
+
+class RecordedResponses:
+    """Embeddings and completions recorded from live runs, keyed by a hash of their input"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {"embeddings": {}, "completions": {}}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.data = json.load(f)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        with self._lock:
+            return self.data[kind].get(key)
+
+    def put(self, kind: str, key: str, value: Any):
+        with self._lock:
+            self.data[kind][key] = value
+
+    def save(self):
+        with self._lock:
+            with open(self.path, 'w') as f:
+                json.dump(self.data, f)
+
+    def add_replayed_latency(self, seconds: float):
+        """Charge a replayed completion's recorded latency to the current question"""
+        self._local.latency = getattr(self._local, "latency", 0.0) + seconds
+
+    def pop_replayed_latency(self) -> float:
+        latency = getattr(self._local, "latency", 0.0)
+        self._local.latency = 0.0
+        return latency
+
+class RecordedEmbeddings(Embeddings):
+    """Embeddings served from recordings, recording misses from a live model if one is given"""
+
+    def __init__(self, store: RecordedResponses, embeddings: Optional[Embeddings] = None):
+        self.store = store
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.store.key("document", text) for text in texts]
+        vectors = [self.store.get("embeddings", key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            if self.embeddings is None:
+                raise KeyError(f"{len(missing)} document embeddings are not recorded, run with --mode record")
+            # Embed all misses in one batch
+            for i, vector in zip(missing, self.embeddings.embed_documents([texts[i] for i in missing])):
+                vectors[i] = vector
+                self.store.put("embeddings", keys[i], vector)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.store.key("query", text)
+        vector = self.store.get("embeddings", key)
+        if vector is None:
+            if self.embeddings is None:
+                raise KeyError(f"Query embedding is not recorded: {text!r}, run with --mode record")
+            vector = self.embeddings.embed_query(text)
+            self.store.put("embeddings", key, vector)
+        return vector
+
+class RecordedLLM(LLM):
+    """Completions served from recordings, recording misses from a live model if one is given"""
+
+    store: Any
+    settings: str
+    llm: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        key = self.store.key(self.settings, prompt)
+        completion = self.store.get("completions", key)
+        if completion is not None:
+            self.store.add_replayed_latency(completion["latency"])
+            return completion["text"]
+
+        if self.llm is None:
+            raise KeyError("Completion is not recorded for this configuration, run with --mode record")
+        start = time.perf_counter()
+        text = self.llm.invoke(prompt).content
+        self.store.put("completions", key, {"text": text, "latency": time.perf_counter() - start})
+        return text
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings, a local stand-in for the Gemini embeddings"""
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * STUB_EMBEDDING_SIZE
+        for word in tokenize(text):
+            index = int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % STUB_EMBEDDING_SIZE
+            vector[index] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+class ExtractiveLLM(LLM):
+    """Answers with the context sentences that best match the question, a local stand-in for Gemini"""
+
+    max_output_tokens: int = MAX_OUTPUT_TOKENS
+
+    @property
+    def _llm_type(self) -> str:
+        return "extractive"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        match = re.search(r"Context:(.*)Question:(.*?)Answer the question", prompt, re.DOTALL)
+        context, question = (match.group(1), match.group(2)) if match else (prompt, prompt)
+        question_words = set(tokenize(question))
+
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", context) if s.strip()]
+        ranked = sorted(sentences, key=lambda s: len(question_words & set(tokenize(s))), reverse=True)
+
+        answer = []
+        for sentence in ranked[:3]:
+            if count_tokens(" ".join(answer + [sentence])) > self.max_output_tokens:
+                break
+            answer.append(sentence)
+        return " ".join(answer)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase content words used for grounding and the stub models"""
+    return [word for word in re.findall(r"[a-z0-9$%]+", text.lower())
+            if len(word) > 2 and word not in STOPWORDS]
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, falling back to an estimate from the word count"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # tiktoken downloads its encoding on first use, which fails offline
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text.split()) * 4 / 3)
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def recall_at_k(expected: List[str], sources: List[str]) -> float:
+    """Fraction of the expected passages found in the retrieved chunks"""
+    if not expected:
+        return 1.0
+    retrieved = [normalize(source) for source in sources]
+    return sum(1 for passage in expected if any(normalize(passage) in source for source in retrieved)) / len(expected)
+
+def grounding(answer: str, sources: List[str]) -> float:
+    """Fraction of the answer's content words that appear in the retrieved chunks"""
+    answer_words = tokenize(answer)
+    if not answer_words:
+        return 0.0
+    context_words = set(tokenize(" ".join(sources)))
+    return sum(1 for word in answer_words if word in context_words) / len(answer_words)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def load_questions(path: str) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def build_agent(config: Dict, mode: str, store: Optional[RecordedResponses], index_dir: str,
+                knowledge_base_path: str, live_embeddings: Optional[Embeddings]) -> ChromapagesRAGAgent:
+    """Build an agent for one configuration, sharing the index between configs with the same chunking"""
+    persist_directory = os.path.join(
+        index_dir, f"{'stub' if mode == 'stub' else 'gemini'}_{config['chunk_size']}_{config['chunk_overlap']}"
+    )
+    settings = json.dumps(
+        {"temperature": config["temperature"], "max_output_tokens": config["max_output_tokens"]},
+        sort_keys=True
+    )
+
+    if mode == "stub":
+        llm, embeddings = ExtractiveLLM(max_output_tokens=config["max_output_tokens"]), HashingEmbeddings()
+    elif mode == "replay":
+        llm, embeddings = RecordedLLM(store=store, settings=settings), RecordedEmbeddings(store)
+    elif mode == "record":
+        llm, embeddings = None, RecordedEmbeddings(store, live_embeddings)
+    else:
+        llm, embeddings = None, live_embeddings
+
+    agent = ChromapagesRAGAgent(
+        knowledge_base_path=knowledge_base_path,
+        persist_directory=persist_directory,
+        llm=llm,
+        embeddings=embeddings,
+        chunk_size=config["chunk_size"],
+        chunk_overlap=config["chunk_overlap"],
+        k=config["k"],
+        temperature=config["temperature"],
+        max_output_tokens=config["max_output_tokens"],
+        verbose=False
+    )
+    if mode == "record":
+        # Wrap the agent's own Gemini model so its completions are recorded
+        agent.llm = RecordedLLM(store=store, settings=settings, llm=agent.llm)
+        agent.chain = agent._setup_chain()
+    return agent
+
+def evaluate_question(agent: ChromapagesRAGAgent, item: Dict, store: Optional[RecordedResponses]) -> Dict:
+    start = time.perf_counter()
+    try:
+        result = agent.ask(item["question"])
+    except Exception as e:
+        return {"question": item["question"], "error": str(e)}
+    latency = time.perf_counter() - start
+    if store is not None:
+        latency += store.pop_replayed_latency()
+
+    return {
+        "question": item["question"],
+        "recall": recall_at_k(item.get("expected", []), result["sources"]),
+        "grounding": grounding(result["answer"], result["sources"]),
+        "answer_tokens": count_tokens(result["answer"]),
+        "context_tokens": count_tokens("\n".join(result["sources"])),
+        "latency": latency
+    }
+
+def summarize(config: Dict, results: List[Dict]) -> Dict:
+    ok = [r for r in results if "error" not in r]
+    latencies = [r["latency"] for r in ok]
+
+    def mean(field):
+        return sum(r[field] for r in ok) / len(ok) if ok else 0.0
+
+    return {
+        "config": config,
+        "questions": len(results),
+        "errors": len(results) - len(ok),
+        "recall_at_k": mean("recall"),
+        "grounding": mean("grounding"),
+        "answer_tokens": mean("answer_tokens"),
+        "context_tokens": mean("context_tokens"),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "results": results
+    }
+
+def print_report(summaries: List[Dict]):
+    header = f"{'chunk':>6} {'ovl':>4} {'k':>3} {'temp':>5} {'max_tok':>7} | {'recall@k':>8} {'ground':>6} " \
+             f"{'ans_tok':>7} {'ctx_tok':>7} {'p50_ms':>7} {'p95_ms':>7} {'p99_ms':>7} {'err':>3}"
+    print(header)
+    print("-" * len(header))
+    for s in summaries:
+        c = s["config"]
+        print(f"{c['chunk_size']:>6} {c['chunk_overlap']:>4} {c['k']:>3} {c['temperature']:>5} {c['max_output_tokens']:>7} | "
+              f"{s['recall_at_k']:>8.2f} {s['grounding']:>6.2f} {s['answer_tokens']:>7.0f} {s['context_tokens']:>7.0f} "
+              f"{s['latency_p50'] * 1000:>7.0f} {s['latency_p95'] * 1000:>7.0f} {s['latency_p99'] * 1000:>7.0f} {s['errors']:>3}")
+
+def pick_best(summaries: List[Dict], min_recall: float, min_grounding: float) -> Optional[Dict]:
+    """Fastest, then cheapest, configuration that keeps answer quality"""
+    qualifying = [s for s in summaries
+                  if not s["errors"] and s["recall_at_k"] >= min_recall and s["grounding"] >= min_grounding]
+    if not qualifying:
+        return None
+    return min(qualifying, key=lambda s: (s["latency_p50"], s["answer_tokens"] + s["context_tokens"]))
+
+def parse_list(value: str, cast):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate RAG answer quality vs. latency across a parameter sweep")
+    parser.add_argument("--mode", choices=["live", "record", "replay", "stub"], default="replay")
+    parser.add_argument("--questions", default=os.path.join("eval", "questions.jsonl"))
+    parser.add_argument("--recordings", default=os.path.join("eval", "recordings.json"))
+    parser.add_argument("--knowledge-base", default="knowledgebase.md")
+    parser.add_argument("--index-dir", help="Keep the sweep's indexes here instead of a temporary directory")
+    parser.add_argument("--chunk-size", default=str(CHUNK_SIZE))
+    parser.add_argument("--chunk-overlap", default=str(CHUNK_OVERLAP))
+    parser.add_argument("--k", default=str(RETRIEVAL_K))
+    parser.add_argument("--temperature", default=str(TEMPERATURE))
+    parser.add_argument("--max-output-tokens", default=str(MAX_OUTPUT_TOKENS))
+    parser.add_argument("--workers", type=int, default=8, help="Questions evaluated in parallel")
+    parser.add_argument("--min-recall", type=float, default=0.8)
+    parser.add_argument("--min-grounding", type=float, default=0.6)
+    parser.add_argument("--output", help="Write the full results as JSON")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    store = RecordedResponses(args.recordings) if args.mode in ("record", "replay") else None
+    live_embeddings = None
+    if args.mode in ("live", "record"):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        live_embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+
+    configs = [
+        {"chunk_size": size, "chunk_overlap": overlap, "k": k, "temperature": temperature, "max_output_tokens": max_tokens}
+        for size, overlap, k, temperature, max_tokens in itertools.product(
+            parse_list(args.chunk_size, int),
+            parse_list(args.chunk_overlap, int),
+            parse_list(args.k, int),
+            parse_list(args.temperature, float),
+            parse_list(args.max_output_tokens, int)
+        )
+    ]
+
+    index_dir = args.index_dir or tempfile.mkdtemp(prefix="chromapages_eval_")
+    summaries = []
+    try:
+        for config in configs:
+            agent = build_agent(config, args.mode, store, index_dir, args.knowledge_base, live_embeddings)
+            try:
+                with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                    results = list(executor.map(lambda item: evaluate_question(agent, item, store), questions))
+            finally:
+                # Release each configuration's index instead of keeping them all open until exit
+                agent.close()
+            summaries.append(summarize(config, results))
+            if store is not None and args.mode == "record":
+                store.save()
+    finally:
+        if not args.index_dir:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+    print_report(summaries)
+    best = pick_best(summaries, args.min_recall, args.min_grounding)
+    if best:
+        print(f"\nBest configuration: {json.dumps(best['config'])}")
+    else:
+        print(f"\nNo configuration reached recall@k >= {args.min_recall} and grounding >= {args.min_grounding}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summaries, f, indent=2)
+
+if __name__ == "__main__":
+    main()
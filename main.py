@@ -1,13 +1,13 @@
-from langchain_community.chat_models import ChatGoogleGenerativeAI
-from langchain.prompts import MessagesPlaceholder
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import LLMChain
-from langchain.schema import SystemMessage
-import google.generativeai as genai
 from config import *
 
+# langchain and google.generativeai are imported inside setup_gemini
+# so that starting the script does not pay their import cost up front.
+
 def setup_gemini():
     """Initialize and configure Gemini model"""
+    import google.generativeai as genai
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
     # Configure Google Gemini
     genai.configure(api_key=GOOGLE_API_KEY)
     
@@ -23,31 +23,10 @@ def setup_gemini():
     )
     return llm
 
-def create_conversation_memory():
-    """Create conversation memory for the agents"""
-    return ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True
-    )
-
-def initialize_chain(llm, memory):
-    """Initialize the LangChain with system message"""
-    system_message = SystemMessage(content="You are a helpful AI assistant.")
-    
-    chain = LLMChain(
-        llm=llm,
-        memory=memory,
-        verbose=VERBOSE,
-        prompt=MessagesPlaceholder(variable_name="chat_history")
-    )
-    return chain
-
 def main():
     try:
         # Setup the environment
-        llm = setup_gemini()
-        memory = create_conversation_memory()
-        chain = initialize_chain(llm, memory)
+        setup_gemini()
         
         print("Environment setup completed. Ready for agent implementation.")
     except Exception as e:
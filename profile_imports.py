@@ -0,0 +1,82 @@
+"""
+Import-time profile for the entry points.
+
+Runs ``python -X importtime`` on each module in a fresh interpreter, prints the
+slowest imports and fails if a module pulls in one of the heavy dependencies at
+load time or exceeds the optional time budget.
+
+Usage:
+    python profile_imports.py                      # profile app, rag_agent and main
+    python profile_imports.py app --budget-ms 500  # also fail if app takes over 500ms
+"""
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ["app", "rag_agent", "main"]
+
+# Dependencies that must only be imported on first use
+HEAVY_MODULES = [
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_google_genai",
+    "chromadb",
+    "google.generativeai",
+]
+
+def profile_module(module: str) -> Dict[str, Tuple[int, int]]:
+    """Return {imported module: (self us, cumulative us)} for importing a module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def find_heavy_imports(timings: Dict[str, Tuple[int, int]]) -> List[str]:
+    """List the heavy dependencies that were imported"""
+    return sorted(
+        heavy for heavy in HEAVY_MODULES
+        if any(name == heavy or name.startswith(heavy + ".") for name in timings)
+    )
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Profile import time of the entry points")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--budget-ms", type=float, help="Fail if a module takes longer than this to import")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to show")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        timings = profile_module(module)
+        total_ms = timings[module][1] / 1000
+        print(f"{module}: {total_ms:.1f}ms")
+
+        slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        for name, (self_us, cumulative_us) in slowest:
+            print(f"  {self_us / 1000:8.1f}ms self {cumulative_us / 1000:8.1f}ms cumulative  {name}")
+
+        heavy = find_heavy_imports(timings)
+        if heavy:
+            print(f"  ERROR: {module} imports {', '.join(heavy)} at load time")
+            failed = True
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            print(f"  ERROR: {module} exceeds the {args.budget_ms:.0f}ms import budget")
+            failed = True
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
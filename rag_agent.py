@@ -1,64 +1,120 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.text_splitter import MarkdownTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
-import google.generativeai as genai
 from config import *
-import markdown
+from conversation import ConversationMemory, rewrite_question
 import os
 
+# langchain, chromadb and google.generativeai take seconds to import, so they are
+# imported inside the methods that need them rather than at module load.
+
 class ChromapagesRAGAgent:
-    def __init__(self):
-        self.llm = self._setup_llm()
-        self.embeddings = self._setup_embeddings()
+    def __init__(self, knowledge_base_path: str = "knowledgebase.md",
+                 persist_directory: str = "chroma_db",
+                 collection_name: str = "langchain",
+                 llm=None, embeddings=None,
+                 chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 k: int = RETRIEVAL_K, temperature: float = TEMPERATURE,
+                 max_output_tokens: int = MAX_OUTPUT_TOKENS, verbose: bool = VERBOSE,
+                 business_name: str = "Chromapages",
+                 business_description: str = "a web design and development company"):
+        self.knowledge_base_path = knowledge_base_path
+        self.persist_directory = persist_directory
+        # "langchain" is Chroma's default collection, used by the existing chroma_db
+        self.collection_name = collection_name
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.k = k
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self.verbose = verbose
+        # The business the assistant speaks for, which differs per tenant
+        self.business_name = business_name
+        self.business = f"{business_name}, {business_description}" if business_description else business_name
+        # The LLM and embeddings can be shared between tenants' agents
+        self.llm = llm or self._setup_llm()
+        self.embeddings = embeddings or self._setup_embeddings()
         self.vector_store = self._setup_vector_store()
         self.chain = self._setup_chain()
+        self.conversation_prompt = self._setup_conversation_prompt()
 
     def _setup_llm(self):
         """Initialize and configure Gemini model"""
+        import google.generativeai as genai
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         genai.configure(api_key=GOOGLE_API_KEY)
         return ChatGoogleGenerativeAI(
             model=DEFAULT_MODEL,
-            temperature=TEMPERATURE,
+            temperature=self.temperature,
             top_p=TOP_P,
             top_k=TOP_K,
-            max_output_tokens=MAX_OUTPUT_TOKENS,
+            max_output_tokens=self.max_output_tokens,
             convert_system_message_to_human=True,
-            verbose=VERBOSE
+            verbose=self.verbose
         )
 
     def _setup_embeddings(self):
         """Setup Google Generative AI embeddings"""
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
         return GoogleGenerativeAIEmbeddings(model="models/embedding-001")
 
+    def _index_version(self) -> str:
+        """Version of the knowledge base and chunking an index is built from"""
+        from answer_cache import knowledge_base_hash
+
+        return f"{knowledge_base_hash(self.knowledge_base_path)}:{self.chunk_size}:{self.chunk_overlap}"
+
     def _setup_vector_store(self):
         """Setup Chroma vector store with knowledge base"""
-        # Read and split the knowledge base
-        with open("knowledgebase.md", "r", encoding="utf-8") as f:
+        from langchain_community.vectorstores import Chroma
+        from langchain.text_splitter import MarkdownTextSplitter
+
+        # The index records what it was built from, so it is rebuilt when the knowledge base changes
+        version_path = os.path.join(self.persist_directory, "knowledge_base.version")
+        version = self._index_version() if os.path.exists(self.knowledge_base_path) else None
+
+        # Load the persisted vector store if it is up to date, or if there is no knowledge base to rebuild from
+        if os.path.exists(self.persist_directory):
+            vector_store = Chroma(
+                collection_name=self.collection_name,
+                persist_directory=self.persist_directory,
+                embedding_function=self.embeddings
+            )
+            built_version = None
+            if os.path.exists(version_path):
+                with open(version_path, "r") as f:
+                    built_version = f.read().strip()
+            if version is None or built_version == version:
+                return vector_store
+            vector_store.delete_collection()
+            self._close_vector_store(vector_store)
+
+        # Otherwise read and split the knowledge base and build it
+        with open(self.knowledge_base_path, "r", encoding="utf-8") as f:
             knowledge_base = f.read()
 
-        text_splitter = MarkdownTextSplitter(chunk_size=1000, chunk_overlap=100)
+        text_splitter = MarkdownTextSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
         texts = text_splitter.split_text(knowledge_base)
 
-        # Create or load vector store
-        if os.path.exists("chroma_db"):
-            return Chroma(persist_directory="chroma_db", embedding_function=self.embeddings)
-        else:
-            return Chroma.from_texts(
-                texts,
-                self.embeddings,
-                persist_directory="chroma_db"
-            )
+        vector_store = Chroma.from_texts(
+            texts,
+            self.embeddings,
+            collection_name=self.collection_name,
+            persist_directory=self.persist_directory
+        )
+        with open(version_path, "w") as f:
+            f.write(version)
+        return vector_store
 
     def _setup_chain(self):
         """Setup the retrieval QA chain"""
+        from langchain.prompts import PromptTemplate
+        from langchain.chains import RetrievalQA
+
         # Create a custom prompt template
-        template = """You are a knowledgeable customer service representative for Chromapages, 
-        a web design and development company. Use the following context to answer questions accurately 
-        and professionally. If you don't find the specific information in the context, say so politely 
-        and offer to help with related information you do have.
+        template = """You are a knowledgeable customer service representative for {business}. 
+        Use the following context to answer questions accurately and professionally. If you don't find 
+        the specific information in the context, say so politely and offer to help with related 
+        information you do have.
 
         Context: {context}
         
@@ -68,7 +124,8 @@ class ChromapagesRAGAgent:
 
         prompt = PromptTemplate(
             template=template,
-            input_variables=["context", "question"]
+            input_variables=["context", "question"],
+            partial_variables={"business": self.business}
         )
 
         return RetrievalQA.from_chain_type(
@@ -76,24 +133,98 @@ class ChromapagesRAGAgent:
             chain_type="stuff",
             retriever=self.vector_store.as_retriever(
                 search_type="similarity",
-                search_kwargs={"k": 3}
+                search_kwargs={"k": self.k}
             ),
             chain_type_kwargs={"prompt": prompt},
             return_source_documents=True,
-            verbose=VERBOSE
+            verbose=self.verbose
+        )
+
+    def _setup_conversation_prompt(self):
+        """Setup the prompt used to answer with the conversation history"""
+        from langchain.prompts import PromptTemplate
+
+        template = """You are a knowledgeable customer service representative for {business}. 
+        Use the following context and the conversation so far to answer questions accurately 
+        and professionally. If you don't find the specific information 
+        in the context, say so politely and offer to help with related information you do have.
+
+        Context: {context}
+
+        Conversation so far:
+        {history}
+        
+        Question: {question}
+        
+        Answer the question based on the context provided."""
+
+        return PromptTemplate(
+            template=template,
+            input_variables=["context", "history", "question"],
+            partial_variables={"business": self.business}
         )
 
-    def chat(self, question: str) -> str:
-        """Process a question and return the response"""
+    def close(self):
+        """Close the index so chromadb releases its memory and file handles"""
+        self._close_vector_store(self.vector_store)
+
+    @staticmethod
+    def _close_vector_store(vector_store):
+        client = vector_store._client
+        if hasattr(client, "close"):
+            client.close()
+            return
+
+        # chromadb releases without Client.close() keep one System per persist
+        # directory for the life of the process, so drop and stop it directly
+        from chromadb.api.client import SharedSystemClient
+
+        system = SharedSystemClient._identifier_to_system.pop(client._identifier, None)
+        if system is not None:
+            system.stop()
+
+    def ask(self, question: str) -> dict:
+        """Process a question and return the answer with the retrieved source chunks"""
+        result = self.chain.invoke({"query": question})
+        return {
+            "answer": result["result"],
+            "sources": [doc.page_content for doc in result["source_documents"]]
+        }
+
+    def converse(self, question: str, memory: ConversationMemory) -> dict:
+        """Answer a question in the context of a conversation and record the turn"""
+        # Retrieve with a standalone version of follow-ups like "how long would that take?"
+        standalone_question = rewrite_question(question, memory, self.llm, self.business_name)
+        docs = self.vector_store.similarity_search(standalone_question, k=self.k)
+
+        prompt = self.conversation_prompt.format(
+            context="\n\n".join(doc.page_content for doc in docs),
+            history=memory.format_history() or "None",
+            question=question
+        )
+        response = self.llm.invoke(prompt)
+        answer = getattr(response, "content", response)
+
+        memory.add_turn(question, answer, standalone_question)
+        return {
+            "answer": answer,
+            "sources": [doc.page_content for doc in docs],
+            "standalone_question": standalone_question
+        }
+
+    def chat(self, question: str, memory: ConversationMemory = None) -> str:
+        """Process a question and return the response, using the conversation history if given"""
         try:
-            result = self.chain.invoke({"query": question})
-            return result["result"]
+            if memory is not None:
+                return self.converse(question, memory)["answer"]
+            return self.ask(question)["answer"]
         except Exception as e:
             return f"I apologize, but I encountered an error: {str(e)}"
 
 def main():
-    # Initialize the RAG agent
-    agent = ChromapagesRAGAgent()
+    # The RAG agent is initialized on the first question so the prompt appears immediately
+    agent = None
+    memory = ConversationMemory()
     
     print("Chromapages Assistant: Hello! I'm here to help you with questions about Chromapages' services. What would you like to know?")
     
@@ -102,8 +233,11 @@ def main():
         if user_input.lower() in ['quit', 'exit', 'bye']:
             print("Chromapages Assistant: Goodbye! Have a great day!")
             break
+
+        if agent is None:
+            agent = ChromapagesRAGAgent()
             
-        response = agent.chat(user_input)
+        response = agent.chat(user_input, memory)
         print(f"Chromapages Assistant: {response}")
 
 if __name__ == "__main__":
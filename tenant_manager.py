@@ -0,0 +1,228 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+import threading
+import json
+import os
+import re
+from config import DEFAULT_TENANT, TENANTS_DIR, TENANT_INDEX_MEMORY_MB, WARMUP_QUESTIONS_PATH
+from rag_agent import ChromapagesRAGAgent
+from answer_cache import AnswerCache
+
+COLLECTION_PREFIX = "chromapages_"
+
+# At most 51 characters, so that with the prefix a collection name stays within
+# the 63 characters chromadb 0.4 and 0.5 allow
+TENANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9](?:[A-Za-z0-9_-]{0,49}[A-Za-z0-9])?$')
+
+class TenantIndexManager:
+    """
+    Serves one RAG agent per tenant knowledge base.
+
+    Each tenant lives in ``<tenants_dir>/<tenant_id>/`` with its own
+    ``knowledgebase.md`` and ``chroma_db`` directory. The default tenant uses the
+    top-level ``knowledgebase.md`` and ``chroma_db``. Indexes are opened on first
+    use and kept in an LRU that evicts the least recently used tenants once the
+    estimated memory of the open indexes exceeds the budget.
+
+    Requests hold an agent through ``with manager.agent(tenant_id) as agent:``.
+    An evicted index leaves the LRU right away but is only closed once the last
+    request using it has released it.
+    """
+
+    def __init__(self, tenants_dir: str = TENANTS_DIR, memory_budget_mb: int = TENANT_INDEX_MEMORY_MB):
+        self.tenants_dir = tenants_dir
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._agents: "OrderedDict[str, Tuple[ChromapagesRAGAgent, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # Requests using each agent, and evicted agents waiting for their last request
+        self._leases: Dict[ChromapagesRAGAgent, int] = {}
+        self._retired: Dict[ChromapagesRAGAgent, str] = {}
+        self._answer_caches: Dict[str, AnswerCache] = {}
+        self._llm = None
+        self._embeddings = None
+
+    def _tenant_paths(self, tenant_id: str) -> Tuple[str, str]:
+        """Return the knowledge base path and persist directory for a tenant"""
+        if tenant_id == DEFAULT_TENANT:
+            return "knowledgebase.md", "chroma_db"
+        tenant_dir = os.path.join(self.tenants_dir, tenant_id)
+        return os.path.join(tenant_dir, "knowledgebase.md"), os.path.join(tenant_dir, "chroma_db")
+
+    def knowledge_base_path(self, tenant_id: str) -> str:
+        """Path of a tenant's knowledge base"""
+        return self._tenant_paths(tenant_id)[0]
+
+    def answer_cache_path(self, tenant_id: str) -> str:
+        """Path of a tenant's precomputed answers, built by warmup_answers.py"""
+        if tenant_id == DEFAULT_TENANT:
+            return "answer_cache.json"
+        return os.path.join(self.tenants_dir, tenant_id, "answer_cache.json")
+
+    def warmup_questions_path(self, tenant_id: str) -> str:
+        """Path of a tenant's curated questions for warmup_answers.py"""
+        if tenant_id == DEFAULT_TENANT:
+            return WARMUP_QUESTIONS_PATH
+        return os.path.join(self.tenants_dir, tenant_id, "warmup_questions.txt")
+
+    def get_answer_cache(self, tenant_id: str = DEFAULT_TENANT) -> AnswerCache:
+        """Get a tenant's precomputed answers, loading them on first use"""
+        with self._lock:
+            if tenant_id not in self._answer_caches:
+                self._answer_caches[tenant_id] = AnswerCache(
+                    self.answer_cache_path(tenant_id), self.knowledge_base_path(tenant_id)
+                )
+            return self._answer_caches[tenant_id]
+
+    def has_tenant(self, tenant_id: str) -> bool:
+        """Check whether a tenant has a knowledge base or a built index"""
+        if not TENANT_ID_PATTERN.match(tenant_id or ''):
+            return False
+        knowledge_base_path, persist_directory = self._tenant_paths(tenant_id)
+        return os.path.exists(knowledge_base_path) or os.path.exists(persist_directory)
+
+    @contextmanager
+    def agent(self, tenant_id: str = DEFAULT_TENANT) -> Iterator[ChromapagesRAGAgent]:
+        """Use a tenant's agent, keeping its index open until the block exits"""
+        agent = self._get_agent(tenant_id, lease=True)
+        try:
+            yield agent
+        finally:
+            self._release(agent)
+
+    def get_agent(self, tenant_id: str = DEFAULT_TENANT) -> ChromapagesRAGAgent:
+        """
+        Get the agent for a tenant, loading its index on first use. The index may be
+        closed once the tenant is evicted, so use ``agent()`` to answer questions.
+        """
+        return self._get_agent(tenant_id, lease=False)
+
+    def _get_agent(self, tenant_id: str, lease: bool) -> ChromapagesRAGAgent:
+        if not self.has_tenant(tenant_id):
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+
+        with self._lock:
+            if tenant_id in self._agents:
+                return self._use(tenant_id, lease)
+            load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+
+        # Load outside the cache lock so other tenants keep being served
+        with load_lock:
+            with self._lock:
+                if tenant_id in self._agents:
+                    return self._use(tenant_id, lease)
+
+            agent = self._load_agent(tenant_id)
+            size = self._estimate_index_size(agent.persist_directory)
+
+            with self._lock:
+                self._agents[tenant_id] = (agent, size)
+                agent = self._use(tenant_id, lease)
+                self._evict()
+            return agent
+
+    def _use(self, tenant_id: str, lease: bool) -> ChromapagesRAGAgent:
+        """Mark an open tenant as most recently used, called with the cache lock held"""
+        self._agents.move_to_end(tenant_id)
+        agent = self._agents[tenant_id][0]
+        if lease:
+            self._leases[agent] = self._leases.get(agent, 0) + 1
+        return agent
+
+    def _release(self, agent: ChromapagesRAGAgent):
+        """Release a lease, closing the index if it was evicted while in use"""
+        with self._lock:
+            self._leases[agent] -= 1
+            if self._leases[agent]:
+                return
+            del self._leases[agent]
+            tenant_id = self._retired.pop(agent, None)
+        if tenant_id is not None:
+            self._close_agent(tenant_id, agent)
+
+    def tenant_profile(self, tenant_id: str) -> Dict[str, str]:
+        """
+        Display name and description of the business a tenant's assistant speaks for,
+        read from ``<tenants_dir>/<tenant_id>/tenant.json``. Without that file the
+        tenant id is used as the name.
+        """
+        if tenant_id == DEFAULT_TENANT:
+            return {}
+        profile_path = os.path.join(self.tenants_dir, tenant_id, "tenant.json")
+        profile = {}
+        if os.path.exists(profile_path):
+            with open(profile_path, 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+        return {
+            'business_name': profile.get('name') or tenant_id,
+            'business_description': profile.get('description', '')
+        }
+
+    def _load_agent(self, tenant_id: str) -> ChromapagesRAGAgent:
+        """Open a tenant's index, sharing the LLM and embeddings between tenants"""
+        knowledge_base_path, persist_directory = self._tenant_paths(tenant_id)
+        collection_name = "langchain" if tenant_id == DEFAULT_TENANT else f"{COLLECTION_PREFIX}{tenant_id}"
+        agent = ChromapagesRAGAgent(
+            knowledge_base_path=knowledge_base_path,
+            persist_directory=persist_directory,
+            collection_name=collection_name,
+            llm=self._llm,
+            embeddings=self._embeddings,
+            **self.tenant_profile(tenant_id)
+        )
+        self._llm = self._llm or agent.llm
+        self._embeddings = self._embeddings or agent.embeddings
+        return agent
+
+    def _estimate_index_size(self, persist_directory: str) -> int:
+        """Estimate the memory used by an open index from its on-disk size"""
+        # A rough proxy: it includes chroma.sqlite3, which mostly stays on disk, but
+        # small collections may not have persisted HNSW segment files to measure yet
+        total = 0
+        for root, _, files in os.walk(persist_directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _evict(self):
+        """Close least recently used indexes until the open ones fit the budget"""
+        # Always keep the most recently used index, even if it alone exceeds the budget
+        while len(self._agents) > 1 and self.memory_usage() > self.memory_budget:
+            tenant_id, (agent, _) = self._agents.popitem(last=False)
+            if agent in self._leases:
+                # Still answering a request, closed when its last lease is released
+                self._retired[agent] = tenant_id
+            else:
+                self._close_agent(tenant_id, agent)
+
+    def _close_agent(self, tenant_id: str, agent: ChromapagesRAGAgent):
+        try:
+            agent.close()
+        except Exception as e:
+            print(f"Error closing index for tenant {tenant_id}: {str(e)}")
+
+    def memory_usage(self) -> int:
+        """Estimated memory in bytes used by the open indexes"""
+        return sum(size for _, size in self._agents.values())
+
+    def open_tenants(self) -> List[str]:
+        """Tenants with an open index, least recently used first"""
+        with self._lock:
+            return list(self._agents.keys())
+
+    def prewarm(self, tenant_ids: List[str]) -> List[str]:
+        """Load the given hot tenants' indexes ahead of their first request"""
+        warmed = []
+        for tenant_id in tenant_ids:
+            if self.memory_usage() >= self.memory_budget:
+                break
+            try:
+                self.get_agent(tenant_id)
+                warmed.append(tenant_id)
+            except Exception as e:
+                print(f"Error prewarming tenant {tenant_id}: {str(e)}")
+        return warmed
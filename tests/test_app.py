@@ -0,0 +1,110 @@
+import pytest
+from flask import url_for
+import app as app_module
+from appointment_agent import AppointmentAgent
+from ticket_manager import TicketManager
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "conversations", app_module.OrderedDict())
+    monkeypatch.setattr(app_module, "conversation_history", [])
+    monkeypatch.setattr(app_module, "log_chat_message", lambda tenant_id, message: None)
+    return app_module.app.test_client()
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """Fresh ticket and appointment stores in a temporary directory, without sending email"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, "ticket_manager", None)
+    monkeypatch.setattr(app_module, "appointment_agent", None)
+    monkeypatch.setattr(TicketManager, "_send_notification", lambda self, subject, body: None)
+    monkeypatch.setattr(AppointmentAgent, "_send_confirmation_emails", lambda self, date, time, lead_info: None)
+    return tmp_path
+
+def get_with_etag(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+@pytest.mark.parametrize("session_id", [["a", "b"], {"id": "a"}, 42, "x" * 129])
+def test_chat_rejects_invalid_session_ids(client, session_id):
+    response = client.post("/chat", json={"message": "Hello", "session_id": session_id})
+
+    assert response.status_code == 400
+    assert app_module.conversations == {}
+
+@pytest.mark.parametrize("tenant", [["x"], {"id": "x"}, 42])
+def test_chat_rejects_invalid_tenants(client, tenant):
+    response = client.post("/chat", json={"message": "Hello", "tenant": tenant})
+
+    assert response.status_code == 400
+
+def test_chat_rejects_unknown_tenants(client):
+    response = client.post("/chat", json={"message": "Hello", "tenant": "missing"})
+
+    assert response.status_code == 404
+
+def test_chat_keeps_a_conversation_per_session(client):
+    response = client.post("/chat", json={"message": "What is your pricing?", "session_id": "session-1"})
+
+    assert response.status_code == 200
+    memory = app_module.conversations[("default", "session-1")]
+    assert memory.turns[-1]['user'] == "What is your pricing?"
+    assert not memory.lock.locked()
+
+def test_conditional_json_returns_304_for_a_matching_etag(client, stores):
+    ticket_id = client.post("/tickets", json={
+        "subject": "Broken form", "description": "The contact form fails", "customer_email": "a@example.com"
+    }).get_json()["ticket_id"]
+
+    response = client.get(f"/tickets/{ticket_id}")
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('W/"')
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    cached = get_with_etag(client, f"/tickets/{ticket_id}", response.headers["ETag"])
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == response.headers["ETag"]
+
+def test_ticket_etag_changes_after_a_status_update(client, stores):
+    ticket_id = client.post("/tickets", json={
+        "subject": "Broken form", "description": "The contact form fails", "customer_email": "a@example.com"
+    }).get_json()["ticket_id"]
+    etag = client.get(f"/tickets/{ticket_id}").headers["ETag"]
+    customer_etag = client.get("/tickets/customer/a@example.com").headers["ETag"]
+
+    assert client.put(f"/tickets/{ticket_id}/status", json={"status": "in_progress"}).status_code == 200
+
+    response = get_with_etag(client, f"/tickets/{ticket_id}", etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["status"] == "in_progress"
+    assert get_with_etag(client, "/tickets/customer/a@example.com", customer_etag).status_code == 200
+
+def test_slot_etag_changes_after_a_booking(client, stores):
+    date = next(iter(AppointmentAgent().available_slots))
+    url = f"/appointments/available?date={date}"
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert get_with_etag(client, url, etag).status_code == 304
+
+    booked = client.post("/appointments/book", json={
+        "date": date, "time": response.get_json()["slots"][0], "lead_info": {"email": "a@example.com"}
+    })
+    assert booked.status_code == 200
+
+    response = get_with_etag(client, url, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()["slots"]) == 6
+
+def test_only_fingerprinted_static_urls_are_cached_forever(client):
+    with app_module.app.test_request_context():
+        fingerprinted_url = url_for("static", filename="script.js")
+    assert "?v=" in fingerprinted_url
+
+    response = client.get(fingerprinted_url)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == f"public, max-age={app_module.STATIC_IMMUTABLE_MAX_AGE}, immutable"
+
+    for url in ("/static/script.js", "/static/script.js?v=outdated"):
+        assert client.get(url).headers["Cache-Control"] == "no-cache"
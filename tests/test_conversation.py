@@ -0,0 +1,97 @@
+import pytest
+from conversation import ConversationMemory, is_follow_up, topic_words, rewrite_question
+
+class RecordingLLM:
+    """Returns a fixed rewrite and keeps the prompts it was given"""
+
+    def __init__(self, response="How long does an e-commerce website take to build?"):
+        self.response = response
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return self.response
+
+@pytest.fixture
+def memory():
+    memory = ConversationMemory()
+    memory.add_turn("How much is an e-commerce website?", "E-commerce websites start at $5,000.")
+    return memory
+
+def test_older_turns_are_summarized_beyond_max_turns():
+    memory = ConversationMemory(max_turns=2, token_budget=1000, summary_tokens=300)
+    for i in range(3):
+        memory.add_turn(f"Question {i}?", f"Answer {i}. More detail.")
+
+    assert [turn['user'] for turn in memory.turns] == ["Question 1?", "Question 2?"]
+    assert list(memory.summary) == ["User asked: Question 0? Assistant: Answer 0."]
+
+def test_latest_turn_is_kept_when_it_exceeds_the_budget():
+    memory = ConversationMemory(max_turns=4, token_budget=40, summary_tokens=20)
+    memory.add_turn("How much is a website?", "Websites start at $2,000.")
+    memory.add_turn("What is included?", " ".join(["word"] * 200))
+
+    assert len(memory.turns) == 1
+    latest = memory.turns[-1]
+    assert latest['user'] == "What is included?"
+    assert latest['assistant'].startswith("word word")
+    assert latest['assistant'].endswith("...")
+    assert memory.token_count() <= memory.token_budget
+    assert memory.last_standalone_question() == "What is included?"
+
+@pytest.mark.parametrize("question", [
+    "How long would that take?",
+    "Does it include hosting?",
+    "Can they be updated later?",
+    "How much are those?",
+])
+def test_pronouns_make_a_follow_up(question):
+    assert is_follow_up(question)
+
+@pytest.mark.parametrize("question", [
+    "Do you also do SEO?",
+    "Is there a discount for nonprofits?",
+    "What is this company about?",
+    "Which one is cheapest?",
+    "What else do you offer?",
+])
+def test_standalone_questions_are_not_follow_ups(question):
+    assert not is_follow_up(question)
+
+def test_topic_words_skip_filler_and_pronouns():
+    assert topic_words("How much is an e-commerce website?") == ["e-commerce", "website"]
+    assert topic_words("How long would that take?") == ["long", "take"]
+
+def test_short_follow_up_gets_the_previous_topic_without_the_llm(memory):
+    llm = RecordingLLM()
+    rewritten = rewrite_question("How long would that take?", memory, llm)
+
+    assert rewritten == "How long would that take? (e-commerce website)"
+    assert llm.prompts == []
+
+def test_standalone_question_is_returned_unchanged(memory):
+    llm = RecordingLLM()
+    for question in ("Do you also do SEO?", "Is there a discount for nonprofits?", "What is this company about?"):
+        assert rewrite_question(question, memory, llm) == question
+    assert llm.prompts == []
+
+def test_first_question_is_returned_unchanged():
+    assert rewrite_question("How long would that take?", ConversationMemory(), RecordingLLM()) == \
+        "How long would that take?"
+
+def test_follow_up_with_its_own_topic_is_rewritten_by_the_llm(memory):
+    llm = RecordingLLM()
+    rewritten = rewrite_question("Do you have a plan that includes hosting?", memory, llm, business_name="Acme")
+
+    assert rewritten == llm.response
+    assert len(llm.prompts) == 1
+    assert "about Acme" in llm.prompts[0]
+    assert "How much is an e-commerce website?" in llm.prompts[0]
+
+def test_llm_failure_falls_back_to_the_previous_question(memory):
+    class FailingLLM:
+        def invoke(self, prompt):
+            raise RuntimeError("quota exceeded")
+
+    assert rewrite_question("Do you have a plan that includes hosting?", memory, FailingLLM()) == \
+        "Do you have a plan that includes hosting? (How much is an e-commerce website?)"
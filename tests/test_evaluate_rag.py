@@ -0,0 +1,48 @@
+from evaluate_rag import recall_at_k, grounding, percentile, pick_best
+
+def summary(latency_p50, recall=1.0, grounded=1.0, errors=0, tokens=100, name=None):
+    return {
+        "config": {"name": name or f"p50={latency_p50}"},
+        "errors": errors,
+        "recall_at_k": recall,
+        "grounding": grounded,
+        "answer_tokens": tokens,
+        "context_tokens": tokens,
+        "latency_p50": latency_p50
+    }
+
+def test_recall_at_k_counts_expected_passages_found_in_the_sources():
+    sources = ["Websites start at  $2,000.\nE-commerce starts at $5,000.", "We offer SEO services."]
+    assert recall_at_k(["websites start at $2,000.", "seo services"], sources) == 1.0
+    assert recall_at_k(["websites start at $2,000.", "Hosting is included"], sources) == 0.5
+    assert recall_at_k(["Hosting is included"], []) == 0.0
+    assert recall_at_k([], sources) == 1.0
+
+def test_grounding_is_the_share_of_answer_words_in_the_sources():
+    sources = ["Websites start at $2,000 and take four weeks."]
+    assert grounding("Websites start at $2,000.", sources) == 1.0
+    assert grounding("Websites include free hosting.", sources) == 0.25
+    assert grounding("", sources) == 0.0
+
+def test_percentile_uses_the_nearest_rank():
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 95) == 5.0
+    assert percentile(values, 0) == 1.0
+    assert percentile([], 50) == 0.0
+
+def test_pick_best_prefers_the_fastest_configuration_that_keeps_quality():
+    fast_but_wrong = summary(100, recall=0.5)
+    fast_but_ungrounded = summary(110, grounded=0.4)
+    fast_with_errors = summary(120, errors=1)
+    slower = summary(300)
+    faster = summary(200, tokens=500)
+    assert pick_best([fast_but_wrong, fast_but_ungrounded, fast_with_errors, slower, faster], 0.8, 0.6) is faster
+
+def test_pick_best_breaks_latency_ties_by_token_cost():
+    cheap = summary(200, tokens=50, name="cheap")
+    costly = summary(200, tokens=500, name="costly")
+    assert pick_best([costly, cheap], 0.8, 0.6) is cheap
+
+def test_pick_best_returns_none_when_nothing_qualifies():
+    assert pick_best([summary(100, recall=0.1), summary(200, grounded=0.1)], 0.8, 0.6) is None
@@ -0,0 +1,43 @@
+import os
+import shutil
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.llms.fake import FakeListLLM
+from rag_agent import ChromapagesRAGAgent
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def knowledge_base(tmp_path):
+    path = tmp_path / "knowledgebase.md"
+    shutil.copy(os.path.join(REPO_ROOT, "knowledgebase.md"), path)
+    return path
+
+def build_agent(knowledge_base, tmp_path):
+    return ChromapagesRAGAgent(
+        knowledge_base_path=str(knowledge_base),
+        persist_directory=str(tmp_path / "chroma_db"),
+        llm=FakeListLLM(responses=["ok"]),
+        embeddings=FakeEmbeddings(size=16),
+        verbose=False
+    )
+
+def indexed_texts(agent):
+    return agent.vector_store.get()["documents"]
+
+def test_index_is_reused_while_the_knowledge_base_is_unchanged(knowledge_base, tmp_path):
+    agent = build_agent(knowledge_base, tmp_path)
+    texts = indexed_texts(agent)
+    agent.close()
+
+    agent = build_agent(knowledge_base, tmp_path)
+    assert sorted(indexed_texts(agent)) == sorted(texts)
+    agent.close()
+
+def test_index_is_rebuilt_when_the_knowledge_base_changes(knowledge_base, tmp_path):
+    build_agent(knowledge_base, tmp_path).close()
+
+    knowledge_base.write_text("# Acme\n\nAcme sells anvils to coyotes.\n")
+    agent = build_agent(knowledge_base, tmp_path)
+    assert indexed_texts(agent) == ["# Acme\n\nAcme sells anvils to coyotes."]
+    agent.close()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.llms.fake import FakeListLLM
+from chromadb.api.client import SharedSystemClient
+from rag_agent import ChromapagesRAGAgent
+from tenant_manager import TenantIndexManager
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def tenants(tmp_path, monkeypatch):
+    """Two tenants with their own copy of the knowledge base, served by fake models"""
+    for tenant_id in ("acme", "beta"):
+        tenant_dir = tmp_path / "tenants" / tenant_id
+        tenant_dir.mkdir(parents=True)
+        shutil.copy(os.path.join(REPO_ROOT, "knowledgebase.md"), tenant_dir / "knowledgebase.md")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ChromapagesRAGAgent, "_setup_llm", lambda self: FakeListLLM(responses=["ok"]))
+    monkeypatch.setattr(ChromapagesRAGAgent, "_setup_embeddings", lambda self: FakeEmbeddings(size=16))
+    return tmp_path / "tenants"
+
+def open_systems():
+    return set(SharedSystemClient._identifier_to_system)
+
+def test_indexes_are_loaded_lazily(tenants):
+    manager = TenantIndexManager(tenants_dir=str(tenants))
+    assert manager.open_tenants() == []
+
+    manager.get_agent("acme")
+    assert manager.open_tenants() == ["acme"]
+    assert os.path.isdir(tenants / "acme" / "chroma_db")
+    assert not os.path.exists(tenants / "beta" / "chroma_db")
+
+def test_eviction_closes_the_index(tenants):
+    manager = TenantIndexManager(tenants_dir=str(tenants), memory_budget_mb=0)
+    acme_path = manager.get_agent("acme").persist_directory
+    assert acme_path in open_systems()
+
+    manager.get_agent("beta")
+    assert manager.open_tenants() == ["beta"]
+    assert acme_path not in open_systems()
+    assert manager.get_agent("beta").persist_directory in open_systems()
+
+def test_evicted_index_stays_open_while_leased(tenants):
+    manager = TenantIndexManager(tenants_dir=str(tenants), memory_budget_mb=0)
+    with manager.agent("acme") as acme:
+        manager.get_agent("beta")
+        assert manager.open_tenants() == ["beta"]
+        assert acme.persist_directory in open_systems()
+        assert acme.chat("What is Chromapages?") == "ok"
+
+    assert acme.persist_directory not in open_systems()
+
+def test_evicted_tenant_can_be_reloaded(tenants):
+    manager = TenantIndexManager(tenants_dir=str(tenants), memory_budget_mb=0)
+    manager.get_agent("acme")
+    manager.get_agent("beta")
+
+    agent = manager.get_agent("acme")
+    assert manager.open_tenants() == ["acme"]
+    assert agent.ask("What is Chromapages?")["answer"] == "ok"
+
+def test_tenants_have_their_own_warmup_questions(tenants):
+    manager = TenantIndexManager(tenants_dir=str(tenants))
+    assert manager.warmup_questions_path("default") == "warmup_questions.txt"
+    assert manager.warmup_questions_path("acme") == str(tenants / "acme" / "warmup_questions.txt")
+
+def test_unknown_tenants_are_rejected(tenants):
+    manager = TenantIndexManager(tenants_dir=str(tenants))
+    assert not manager.has_tenant("missing")
+    assert not manager.has_tenant("../acme")
+    (tenants / ("a" * 52)).mkdir()
+    (tenants / ("a" * 52) / "knowledgebase.md").write_text("# Too long for a collection name")
+    assert not manager.has_tenant("a" * 52)
+    with pytest.raises(KeyError):
+        manager.get_agent("missing")
+
+def test_prompts_use_the_tenant_business_name(tenants):
+    (tenants / "acme" / "tenant.json").write_text('{"name": "Acme Plumbing", "description": "a plumbing company"}')
+    manager = TenantIndexManager(tenants_dir=str(tenants))
+
+    acme = manager.get_agent("acme")
+    qa_prompt = acme.chain.combine_documents_chain.llm_chain.prompt.format(context="c", question="q")
+    conversation_prompt = acme.conversation_prompt.format(context="c", history="h", question="q")
+    for prompt in (qa_prompt, conversation_prompt):
+        assert "Acme Plumbing, a plumbing company" in prompt
+        assert "Chromapages" not in prompt
+
+    beta = manager.get_agent("beta")
+    assert "representative for beta." in beta.conversation_prompt.format(context="c", history="h", question="q")
@@ -0,0 +1,146 @@
+"""
+Precompute answers to the most frequent questions.
+
+Mines the chat log (CHAT_LOG_PATH) for the most frequent standalone questions,
+adds the tenant's curated questions (warmup_questions.txt, or
+tenants/<id>/warmup_questions.txt for other tenants), answers them in one batch
+through the tenant's RAG agent and writes a compact lookup artifact
+(answer_cache.json) that the app loads at startup. Nothing is rebuilt if the
+knowledge base and the question set are unchanged since the last run, so the
+job can run on every deploy.
+
+Usage:
+    python warmup_answers.py
+    python warmup_answers.py --tenant acme --chat-log chat_log.jsonl --top 100
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import hashlib
+import json
+import os
+import sys
+from answer_cache import normalize_question, knowledge_base_hash
+from config import DEFAULT_TENANT, CHAT_LOG_PATH, WARMUP_TOP_N
+from conversation import is_follow_up
+from tenant_manager import TenantIndexManager
+
+def mine_questions(chat_log_path: str, tenant_id: str, top_n: int, min_count: int) -> List[str]:
+    """Most frequent standalone questions in the chat log, in their most common phrasing"""
+    counts = Counter()
+    phrasings: Dict[str, Counter] = {}
+    with open(chat_log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            message = (entry.get('message') or '').strip()
+            # Follow-ups depend on the conversation, so their answers cannot be reused
+            if entry.get('tenant', DEFAULT_TENANT) != tenant_id or not message or is_follow_up(message):
+                continue
+            key = normalize_question(message)
+            counts[key] += 1
+            phrasings.setdefault(key, Counter())[message] += 1
+
+    return [
+        phrasings[key].most_common(1)[0][0]
+        for key, count in counts.most_common(top_n)
+        if count >= min_count
+    ]
+
+def load_curated_questions(path: str) -> List[str]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def questions_hash(questions: List[str]) -> str:
+    keys = sorted({normalize_question(question) for question in questions})
+    return hashlib.sha256("\n".join(keys).encode('utf-8')).hexdigest()
+
+def load_artifact(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def build_answers(agent, questions: List[str], workers: int) -> Dict[str, str]:
+    """Answer all questions in one batch through the agent's retrieval QA chain"""
+    results = agent.chain.batch(
+        [{"query": question} for question in questions],
+        config={"max_concurrency": workers},
+        return_exceptions=True
+    )
+    answers = {}
+    for question, result in zip(questions, results):
+        if isinstance(result, Exception):
+            print(f"Error answering {question!r}: {str(result)}")
+            continue
+        answers[normalize_question(question)] = result["result"]
+    return answers
+
+def write_artifact(path: str, artifact: Dict):
+    """Write the artifact atomically so a running app never reads a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Precompute answers to the most frequent questions")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT)
+    parser.add_argument("--chat-log", default=CHAT_LOG_PATH, help="JSONL chat log written by the app")
+    parser.add_argument("--questions", help="Curated questions, one per line (default: the tenant's warmup_questions.txt)")
+    parser.add_argument("--top", type=int, default=WARMUP_TOP_N, help="Number of questions mined from the chat log")
+    parser.add_argument("--min-count", type=int, default=3, help="Minimum times a question was asked to be mined")
+    parser.add_argument("--workers", type=int, default=8, help="Questions answered in parallel")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if nothing has changed")
+    args = parser.parse_args()
+
+    manager = TenantIndexManager()
+    if not manager.has_tenant(args.tenant):
+        print(f"Unknown tenant: {args.tenant}")
+        return 1
+
+    # Without a tenant's own list only the mined questions are used
+    questions = load_curated_questions(args.questions or manager.warmup_questions_path(args.tenant))
+    if args.chat_log and os.path.exists(args.chat_log):
+        questions += mine_questions(args.chat_log, args.tenant, args.top, args.min_count)
+    # Drop repeated phrasings of the same question
+    unique_questions = {}
+    for question in questions:
+        unique_questions.setdefault(normalize_question(question), question)
+    questions = list(unique_questions.values())
+    if not questions:
+        print("No questions to precompute")
+        return 1
+
+    path = manager.answer_cache_path(args.tenant)
+    kb_hash = knowledge_base_hash(manager.knowledge_base_path(args.tenant))
+    q_hash = questions_hash(questions)
+
+    existing = load_artifact(path)
+    if not args.force and existing and existing.get('knowledge_base_sha256') == kb_hash \
+            and existing.get('questions_sha256') == q_hash:
+        print(f"{path} is up to date ({len(existing.get('answers', {}))} answers)")
+        return 0
+
+    # Opening the agent rebuilds the tenant's index if the knowledge base changed since it
+    # was built, so the answers are retrieved from the same knowledge base as kb_hash
+    with manager.agent(args.tenant) as agent:
+        answers = build_answers(agent, questions, args.workers)
+    complete = len(answers) == len(questions)
+    write_artifact(path, {
+        'knowledge_base_sha256': kb_hash,
+        # Left empty after failures so the next run retries the missing answers
+        'questions_sha256': q_hash if complete else None,
+        'built_at': datetime.now().isoformat(),
+        'answers': answers
+    })
+    print(f"Wrote {len(answers)} of {len(questions)} answers to {path}")
+    return 0 if complete else 1
+
+if __name__ == "__main__":
+    sys.exit(main())